@@ -1,23 +1,56 @@
 import os
+import re
 import json
-import requests
+import math
+import asyncio
+import random
+import threading
+import time
+import uuid
+import httpx
 import streamlit as st
-from dotenv import load_dotenv
 from pathlib import Path
+from string import Template
 import datetime
-import pandas as pd
+import heapq
+import html
+from collections import defaultdict
+from contextlib import contextmanager
 from io import BytesIO
-import base64
 
+try:
+    import orjson
+except ImportError:
+    # Falls back to ujson, then the stdlib json module, with identical on-disk output
+    orjson = None
 
-# Load .env from the script directory to ensure Streamlit finds it regardless of CWD
-here = Path(__file__).resolve().parent
-env_path = here / ".env"
-if env_path.exists():
-    load_dotenv(dotenv_path=str(env_path))
-else:
-    # Fallback to default load (searches CWD and parents)
-    load_dotenv()
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    from openai import OpenAI, AsyncOpenAI
+except ImportError:
+    # OpenAI is an optional provider; only needed when MODEL_PROVIDER=openai
+    OpenAI = AsyncOpenAI = None
+
+
+@st.cache_resource(show_spinner=False)
+def _load_env():
+    """Load .env once per process rather than on every script rerun."""
+    from dotenv import load_dotenv
+
+    # Load .env from the script directory to ensure Streamlit finds it regardless of CWD
+    env_path = Path(__file__).resolve().parent / ".env"
+    if env_path.exists():
+        load_dotenv(dotenv_path=str(env_path))
+    else:
+        # Fallback to default load (searches CWD and parents)
+        load_dotenv()
+
+
+_load_env()
 
 # Configuration via .env (read after load_dotenv)
 MODEL_PROVIDER = os.getenv("MODEL_PROVIDER", "gemini").lower()  # 'gemini' or 'openai'
@@ -25,6 +58,12 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+ACTIVE_MODEL = GEMINI_MODEL if MODEL_PROVIDER == "gemini" else OPENAI_MODEL
+
+# History is stored as JSON Lines (one record per line) so saves are a single append
+HISTORY_PATH = "content_history.jsonl"
+LEGACY_HISTORY_PATH = "content_history.json"
+HISTORY_PAGE_SIZE = 20
 
 # Normalize keys: strip surrounding quotes if the .env contains them
 if GEMINI_API_KEY:
@@ -33,13 +72,36 @@ if OPENAI_API_KEY:
     OPENAI_API_KEY = OPENAI_API_KEY.strip().strip('"').strip("'")
 
 
-def generate_with_gemini(prompt: str, model: str = GEMINI_MODEL, api_key: str = None, max_tokens: int = 256, temperature: float = 0.7) -> str:
-    """Generate text using Google Generative AI REST endpoint using API key."""
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+# Rate limits and transient server errors are retried with exponential backoff + jitter
+GEMINI_MAX_ATTEMPTS = 5
+GEMINI_RETRY_MAX_DELAY = 8.0
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Only failures before the request reached the server; a read timeout may already be billed
+RETRYABLE_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+# Upper bound on in-flight requests for batch generation
+MAX_CONCURRENT_REQUESTS = 8
+
+
+@st.cache_resource(show_spinner=False)
+def _gemini_client():
+    """Shared keep-alive HTTP/2 client so repeat generations skip the TCP+TLS handshake."""
+    return httpx.Client(
+        http2=True,
+        timeout=30,
+        limits=httpx.Limits(max_keepalive_connections=16),
+    )
+
+
+def _gemini_request(prompt: str, model: str, api_key: str, max_tokens: int, temperature: float, stream: bool = False) -> dict:
+    """Build the URL and request kwargs for a (streaming) generateContent call."""
     if api_key is None:
         raise RuntimeError("GEMINI_API_KEY not set")
 
     # Use the correct endpoint format for Gemini Pro
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+    method = "streamGenerateContent" if stream else "generateContent"
     
     headers = {
         'Content-Type': 'application/json',
@@ -48,6 +110,8 @@ def generate_with_gemini(prompt: str, model: str = GEMINI_MODEL, api_key: str =
     params = {
         'key': api_key
     }
+    if stream:
+        params['alt'] = 'sse'
     
     body = {
         "contents": [{"parts": [{"text": prompt}]}],
@@ -56,44 +120,178 @@ def generate_with_gemini(prompt: str, model: str = GEMINI_MODEL, api_key: str =
             "maxOutputTokens": max_tokens,
         }
     }
+    return {"url": f"{GEMINI_BASE_URL}/{model}:{method}", "json": body, "headers": headers, "params": params}
+
+
+def _retry_delay(attempt: int, resp: httpx.Response = None) -> float:
+    """Seconds to wait before retry number ``attempt`` (0-based), honoring Retry-After."""
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), GEMINI_RETRY_MAX_DELAY)
+        except ValueError:
+            pass  # HTTP-date form; fall back to backoff
+    return min(GEMINI_RETRY_MAX_DELAY, 0.5 * 2 ** attempt + random.uniform(0, 1))
+
+
+def _send_gemini(client: httpx.Client, request: dict, stream: bool = False) -> httpx.Response:
+    """Send a Gemini request, retrying 429/5xx responses and failed connections."""
+    for attempt in range(GEMINI_MAX_ATTEMPTS):
+        last_attempt = attempt == GEMINI_MAX_ATTEMPTS - 1
+        try:
+            resp = client.send(client.build_request("POST", **request), stream=stream)
+        except RETRYABLE_TRANSPORT_ERRORS:
+            if last_attempt:
+                raise
+            time.sleep(_retry_delay(attempt))
+            continue
+        if resp.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+            return resp
+        resp.close()
+        time.sleep(_retry_delay(attempt, resp))
+
+
+async def _asend_gemini(client: httpx.AsyncClient, request: dict) -> httpx.Response:
+    """Async counterpart of _send_gemini."""
+    for attempt in range(GEMINI_MAX_ATTEMPTS):
+        last_attempt = attempt == GEMINI_MAX_ATTEMPTS - 1
+        try:
+            resp = await client.post(**request)
+        except RETRYABLE_TRANSPORT_ERRORS:
+            if last_attempt:
+                raise
+            await asyncio.sleep(_retry_delay(attempt))
+            continue
+        if resp.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+            return resp
+        await asyncio.sleep(_retry_delay(attempt, resp))
+
+
+async def _gather_limited(coros, limit: int = MAX_CONCURRENT_REQUESTS) -> list:
+    """asyncio.gather with at most ``limit`` coroutines running at once."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(c) for c in coros))
+
+
+def _raise_for_gemini_error(resp: httpx.Response):
+    if not resp.is_success:
+        try:
+            err_body = resp.json()
+        except Exception:
+            err_body = resp.text
+        raise RuntimeError(f"Gemini API error ({resp.status_code}): {err_body}")
+
+
+def _extract_gemini_text(data: dict) -> str:
+    candidates = data.get("candidates", [])
+    if candidates and len(candidates) > 0:
+        content = candidates[0].get("content", {})
+        parts = content.get("parts", [])
+        if parts and len(parts) > 0:
+            return parts[0].get("text", "")
+    return ""
+
+
+async def agenerate_with_gemini(prompt: str, model: str = GEMINI_MODEL, api_key: str = None, max_tokens: int = 256, temperature: float = 0.7, client: httpx.AsyncClient = None) -> str:
+    """Generate text using Google Generative AI REST endpoint using API key.
+
+    Pass a shared ``client`` to multiplex several generations over one HTTP/2 connection.
+    """
+    request = _gemini_request(prompt, model, api_key, max_tokens, temperature)
 
     try:
-        resp = requests.post(url, json=body, headers=headers, params=params, timeout=30)
+        if client is None:
+            async with httpx.AsyncClient(http2=True, timeout=30) as own_client:
+                resp = await _asend_gemini(own_client, request)
+        else:
+            resp = await _asend_gemini(client, request)
         
-        if not resp.ok:
-            try:
-                err_body = resp.json()
-            except Exception:
-                err_body = resp.text
-            raise RuntimeError(f"Gemini API error ({resp.status_code}): {err_body}")
-
-        data = resp.json()
-        candidates = data.get("candidates", [])
-        if candidates and len(candidates) > 0:
-            content = candidates[0].get("content", {})
-            parts = content.get("parts", [])
-            if parts and len(parts) > 0:
-                return parts[0].get("text", "").strip()
+        _raise_for_gemini_error(resp)
+        return _extract_gemini_text(_json_loads(resp.content)).strip() or "No response generated"
         
-        return "No response generated"
+    except Exception as e:
+        raise RuntimeError(f"Gemini generation failed: {e}")
+
+
+def generate_with_gemini(prompt: str, model: str = GEMINI_MODEL, api_key: str = None, max_tokens: int = 256, temperature: float = 0.7) -> str:
+    """Generate text over the pooled Gemini connection."""
+    request = _gemini_request(prompt, model, api_key, max_tokens, temperature)
+
+    try:
+        resp = _send_gemini(_gemini_client(), request)
+        _raise_for_gemini_error(resp)
+        return _extract_gemini_text(_json_loads(resp.content)).strip() or "No response generated"
         
     except Exception as e:
         raise RuntimeError(f"Gemini generation failed: {e}")
 
 
-def generate_with_openai(prompt: str, model: str = OPENAI_MODEL, api_key: str = None, max_tokens: int = 256, temperature: float = 0.7) -> str:
-    """Minimal OpenAI completion fallback. Uses the openai package if available.
-    If openai is not installed, raises ImportError.
-    """
+def stream_with_gemini(prompt: str, model: str = GEMINI_MODEL, api_key: str = None, max_tokens: int = 256, temperature: float = 0.7):
+    """Yield text deltas from the Gemini SSE endpoint as they arrive."""
+    request = _gemini_request(prompt, model, api_key, max_tokens, temperature, stream=True)
+
     try:
-        import openai
+        resp = _send_gemini(_gemini_client(), request, stream=True)
+        try:
+            if not resp.is_success:
+                resp.read()
+                _raise_for_gemini_error(resp)
+
+            for line in resp.iter_lines():
+                # SSE frames look like "data: {...}"; blank lines separate events
+                if not line.startswith("data:"):
+                    continue
+                text = _extract_gemini_text(_json_loads(line[len("data:"):]))
+                if text:
+                    yield text
+        finally:
+            resp.close()
+        
     except Exception as e:
-        raise RuntimeError("openai package not installed or unavailable: " + str(e))
+        raise RuntimeError(f"Gemini generation failed: {e}")
+
+
+def _require_openai():
+    if OpenAI is None:
+        raise RuntimeError("openai package not installed or unavailable (pip install 'openai>=1.0')")
+
+
+@st.cache_resource(show_spinner=False)
+def _openai_client(api_key: str = None):
+    """One OpenAI client (and connection pool) per API key for the life of the process."""
+    _require_openai()
+    return OpenAI(api_key=api_key)
+
+
+def generate_with_openai(prompt: str, model: str = OPENAI_MODEL, api_key: str = None, max_tokens: int = 256, temperature: float = 0.7) -> str:
+    """Minimal OpenAI chat completion fallback. Uses the openai package if available.
+    If openai is not installed, raises RuntimeError.
+    """
+    resp = _openai_client(api_key).chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        temperature=temperature,
+    )
+    return resp.choices[0].message.content.strip()
+
 
-    if api_key:
-        openai.api_key = api_key
+async def agenerate_with_openai(prompt: str, model: str = OPENAI_MODEL, api_key: str = None, max_tokens: int = 256, temperature: float = 0.7, client: "AsyncOpenAI" = None) -> str:
+    """Async OpenAI chat completion, used by generate_batch.
 
-    resp = openai.ChatCompletion.create(
+    Pass a shared ``client`` to run a whole batch over one connection pool.
+    """
+    _require_openai()
+    if client is None:
+        async with AsyncOpenAI(api_key=api_key) as own_client:
+            return await agenerate_with_openai(prompt, model=model, max_tokens=max_tokens, temperature=temperature, client=own_client)
+
+    resp = await client.chat.completions.create(
         model=model,
         messages=[{"role": "user", "content": prompt}],
         max_tokens=max_tokens,
@@ -116,487 +314,765 @@ def generate_text(prompt: str, provider: str = MODEL_PROVIDER, **kwargs) -> str:
         raise ValueError(f"Unknown model provider: {provider}")
 
 
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def _cached_generate(prompt: str, provider: str, model: str, max_tokens: int, temperature: float) -> str:
+    """Memoized generate_text for deterministic (temperature 0) requests.
+
+    ``model`` is only part of the cache key; API keys are read from module config and never cached.
+    """
+    return generate_text(prompt, provider=provider, max_tokens=max_tokens, temperature=temperature)
+
+
+def stream_text(prompt: str, provider: str = MODEL_PROVIDER, **kwargs):
+    """Yield generated text incrementally; providers without streaming yield one chunk."""
+    provider = provider.lower()
+    if provider == "gemini":
+        if not GEMINI_API_KEY:
+            raise RuntimeError("GEMINI_API_KEY not found in environment. Set it in .env.")
+        yield from stream_with_gemini(prompt, model=GEMINI_MODEL, api_key=GEMINI_API_KEY, **kwargs)
+    else:
+        yield generate_text(prompt, provider=provider, **kwargs)
+
+
+async def generate_batch(prompts, provider: str = MODEL_PROVIDER, **kwargs) -> list:
+    """Run several generations concurrently so K prompts cost ~1 round trip instead of K."""
+    provider = provider.lower()
+    if provider == "gemini":
+        if not GEMINI_API_KEY:
+            raise RuntimeError("GEMINI_API_KEY not found in environment. Set it in .env.")
+        # One client for the whole batch so the requests share an HTTP/2 connection
+        async with httpx.AsyncClient(http2=True, timeout=30) as client:
+            return await _gather_limited((
+                agenerate_with_gemini(p, model=GEMINI_MODEL, api_key=GEMINI_API_KEY, client=client, **kwargs)
+                for p in prompts
+            ))
+    elif provider == "openai":
+        if not OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY not found in environment. Set it in .env.")
+        _require_openai()
+        async with AsyncOpenAI(api_key=OPENAI_API_KEY) as client:
+            return await _gather_limited((
+                agenerate_with_openai(p, model=OPENAI_MODEL, client=client, **kwargs)
+                for p in prompts
+            ))
+    else:
+        raise ValueError(f"Unknown model provider: {provider}")
+
+
+# Prompt fragments used by build_prompt
+# Content type specific instructions ("Poem" is filled in with the requested length)
+CONTENT_INSTRUCTIONS = {
+    "Quote": "Write a memorable, inspiring quote",
+    "Poem": "Create a {length_words}-word poem (3-8 lines preferred)",
+    "Haiku": "Write a traditional 3-line Haiku (5-7-5 syllable pattern)",
+    "Motivational Saying": "Create an uplifting motivational saying",
+    "Social Media Caption": "Write a catchy social media caption (under 280 characters)",
+    "Song Lyrics": "Write song lyrics with rhythm and flow",
+    "Story Beginning": "Write an engaging story opening paragraph"
+}
+
+# Language instructions
+LANGUAGE_MAP = {
+    "English": "",
+    "Hindi": "Write in Hindi language",
+    "Marathi": "Write in Marathi language",
+    "Spanish": "Write in Spanish language", 
+    "French": "Write in French language",
+    "German": "Write in German language"
+}
+
+# Tone instructions
+TONE_MAP = {
+    "Funny": "Make it humorous and witty",
+    "Serious": "Keep it thoughtful and profound",
+    "Romantic": "Make it romantic and heartfelt",
+    "Professional": "Keep it professional and polished",
+    "Inspirational": "Make it uplifting and motivating"
+}
+
+# Audience instructions
+AUDIENCE_MAP = {
+    "Kids": "Use simple, fun language suitable for children",
+    "Adults": "Use mature, sophisticated language",
+    "Professionals": "Use formal, business-appropriate language",
+    "General": ""
+}
+
+# Rhyme scheme for poems
+RHYME_MAP = {
+    "Free Verse": "Use free verse (no specific rhyme scheme)",
+    "ABAB": "Use ABAB rhyme scheme",
+    "AABB": "Use AABB rhyme scheme (couplets)",
+    "ABCB": "Use ABCB rhyme scheme"
+}
+
+
 def build_prompt(keyword: str, content_type: str, language: str, tone: str, audience: str, rhyme_scheme: str, length_words: int) -> str:
     """Constructs a comprehensive prompt for the model to produce various types of content."""
-    
-    # Content type specific instructions
-    content_instructions = {
-        "Quote": "Write a memorable, inspiring quote",
-        "Poem": f"Create a {length_words}-word poem (3-8 lines preferred)",
-        "Haiku": "Write a traditional 3-line Haiku (5-7-5 syllable pattern)",
-        "Motivational Saying": "Create an uplifting motivational saying",
-        "Social Media Caption": "Write a catchy social media caption (under 280 characters)",
-        "Song Lyrics": "Write song lyrics with rhythm and flow",
-        "Story Beginning": "Write an engaging story opening paragraph"
-    }
-    
-    # Language instructions
-    language_map = {
-        "English": "",
-        "Hindi": "Write in Hindi language",
-        "Marathi": "Write in Marathi language",
-        "Spanish": "Write in Spanish language", 
-        "French": "Write in French language",
-        "German": "Write in German language"
-    }
-    
-    # Tone instructions
-    tone_map = {
-        "Funny": "Make it humorous and witty",
-        "Serious": "Keep it thoughtful and profound",
-        "Romantic": "Make it romantic and heartfelt",
-        "Professional": "Keep it professional and polished",
-        "Inspirational": "Make it uplifting and motivating"
-    }
-    
-    # Audience instructions
-    audience_map = {
-        "Kids": "Use simple, fun language suitable for children",
-        "Adults": "Use mature, sophisticated language",
-        "Professionals": "Use formal, business-appropriate language",
-        "General": ""
-    }
-    
-    # Rhyme scheme for poems
-    rhyme_map = {
-        "Free Verse": "Use free verse (no specific rhyme scheme)",
-        "ABAB": "Use ABAB rhyme scheme",
-        "AABB": "Use AABB rhyme scheme (couplets)",
-        "ABCB": "Use ABCB rhyme scheme"
-    }
+    instruction = CONTENT_INSTRUCTIONS.get(content_type, 'Write content')
+    if content_type == "Poem":
+        instruction = instruction.format(length_words=length_words)
     
     # Build the prompt
-    prompt = f"{content_instructions.get(content_type, 'Write content')} about '{keyword}'. "
+    parts = [instruction, f" about '{keyword}'. "]
     
     if language != "English":
-        prompt += f"{language_map.get(language, '')}. "
+        parts.append(f"{LANGUAGE_MAP.get(language, '')}. ")
     
     if tone != "Inspirational":
-        prompt += f"{tone_map.get(tone, '')}. "
+        parts.append(f"{TONE_MAP.get(tone, '')}. ")
     
     if audience != "General":
-        prompt += f"{audience_map.get(audience, '')}. "
+        parts.append(f"{AUDIENCE_MAP.get(audience, '')}. ")
     
     if content_type == "Poem" and rhyme_scheme != "Free Verse":
-        prompt += f"{rhyme_map.get(rhyme_scheme, '')}. "
+        parts.append(f"{RHYME_MAP.get(rhyme_scheme, '')}. ")
     
-    return prompt.strip()
+    return "".join(parts).strip()
+
+
+def _json_loads(data):
+    """Parse JSON from bytes or str, using orjson or ujson when installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if ujson is not None:
+        return ujson.loads(data)
+    return json.loads(data)
+
+
+def _json_line(obj) -> bytes:
+    """Serialize one record as a UTF-8 JSON Lines entry."""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS matches json.dumps, which coerces int/float keys instead of raising
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+    if ujson is not None:
+        # ujson escapes "/" by default; json.dumps does not
+        return (ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False) + "\n").encode("utf-8")
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _load_jsonl(path):
+    """Read a JSON Lines file into a list, skipping blank or torn lines."""
+    items = []
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    items.append(_json_loads(line))
+                except ValueError:
+                    continue
+    if _assign_unique_ids(items):
+        # Persist the repaired ids so they stay stable across reloads
+        _write_history(items)
+    return items
+
+
+def _assign_unique_ids(items):
+    """Give a fresh uuid to records with a missing or repeated id. Returns how many changed.
+
+    Older files numbered records len(history)+1, which reuses an id after a delete.
+    """
+    seen = set()
+    changed = 0
+    for item in items:
+        item_id = item.get("id")
+        if item_id is None or item_id in seen:
+            item_id = item["id"] = uuid.uuid4().hex
+            changed += 1
+        seen.add(item_id)
+    return changed
+
+
+def _write_history(items):
+    """Rewrite the whole history file. Only needed for edits and deletes, never for saves.
+
+    The new contents go to a temp file that is swapped in with os.replace, so a crash
+    mid-write leaves the previous history intact instead of a truncated file.
+    """
+    # Encode everything first and hand the OS one buffer instead of one write per record
+    data = b"".join([_json_line(item) for item in items])
+    tmp_path = HISTORY_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, HISTORY_PATH)
+
+
+def _migrate_legacy_history():
+    """Convert a pre-JSONL content_history.json into the JSON Lines format."""
+    try:
+        items = _json_loads(Path(LEGACY_HISTORY_PATH).read_bytes())
+    except Exception:
+        items = []
+    _assign_unique_ids(items)
+    _write_history(items)
+
+
+def _history_mtime():
+    """File modification time used as a cache key for data derived from history."""
+    try:
+        return os.stat(HISTORY_PATH).st_mtime_ns
+    except OSError:
+        return 0
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class SearchIndex:
+    """Inverted index over keyword/output/tags plus id sets for the type and favorite filters.
+
+    Kept alongside the history store and updated in place by every write, so it is
+    built once per process rather than on each change.
+    """
+
+    def __init__(self, history=()):
+        self.rebuild(history)
+
+    def rebuild(self, history=()):
+        """Re-index from scratch, keeping this object so holders of it stay current."""
+        self.postings = defaultdict(set)
+        self.by_type = defaultdict(set)
+        self.favorites = set()
+        self.lowered = {}  # id -> lowercased (keyword, output, tags) for substring checks
+        self.items = {}  # id -> item, in history order
+        self.order = {}  # id -> ever-increasing position, to sort candidates into history order
+        self._next_position = 0
+        self._entries = {}  # id -> (tokens, content_type), needed to undo an add
+        for item in history:
+            self.add(item)
+
+    def add(self, item):
+        item_id = item["id"]
+        if item_id in self.items:
+            raise ValueError(f"history id {item_id!r} is already indexed")
+        # str(... or "") so a null or non-string field in a hand-edited file can't break loading
+        fields = tuple(str(item.get(key) or "").lower() for key in ("keyword", "output", "tags"))
+        tokens = set(_TOKEN_RE.findall("\n".join(fields)))
+        content_type = item.get("content_type")
+        for token in tokens:
+            self.postings[token].add(item_id)
+        self.by_type[content_type].add(item_id)
+        if item.get("favorite", False):
+            self.favorites.add(item_id)
+        self.lowered[item_id] = fields
+        self.items[item_id] = item
+        self.order[item_id] = self._next_position
+        self._next_position += 1
+        self._entries[item_id] = (tokens, content_type)
+
+    def remove(self, item_id):
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return
+        tokens, content_type = entry
+        for token in tokens:
+            ids = self.postings[token]
+            ids.discard(item_id)
+            if not ids:
+                del self.postings[token]
+        self.by_type[content_type].discard(item_id)
+        self.favorites.discard(item_id)
+        self.lowered.pop(item_id, None)
+        self.items.pop(item_id, None)
+        self.order.pop(item_id, None)
+
+    def toggle_fav(self, item_id, favorite):
+        if favorite:
+            self.favorites.add(item_id)
+        else:
+            self.favorites.discard(item_id)
+
+    def candidates(self, q, type_filter=None, filter_favorite=False):
+        """Ids that may match, or None when no filter narrows the set.
+
+        Every word of the query must lie inside some indexed token of a matching item,
+        so the postings of all tokens containing it are unioned. This keeps substring
+        semantics; callers still confirm the full query on the returned ids.
+        """
+        candidates = None
+        
+        # Filter by type
+        if type_filter:
+            candidates = set(self.by_type.get(type_filter, ()))
+        
+        # Filter by favorite
+        if filter_favorite:
+            candidates = set(self.favorites) if candidates is None else candidates & self.favorites
+        
+        total = len(self.items)
+        for term in _TOKEN_RE.findall(q):
+            if len(term) < 2:
+                continue  # Nearly every token contains one letter; the verify pass is cheaper
+            matches = set()
+            for token, ids in self.postings.items():
+                if term in token:
+                    matches |= ids
+                    if len(matches) == total:
+                        break  # Already every item; the rest of the vocabulary can't add any
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return set()
+        
+        return candidates
+
+
+@st.cache_resource(show_spinner=False)
+def _history_store():
+    """Process-wide in-memory history, parsed from disk once and kept in sync on every write."""
+    if not os.path.exists(HISTORY_PATH) and os.path.exists(LEGACY_HISTORY_PATH):
+        _migrate_legacy_history()
+    items = _load_jsonl(HISTORY_PATH)
+    return {
+        "path": HISTORY_PATH,
+        "items": items,
+        "index": SearchIndex(items),
+        "mtime": _history_mtime(),
+        "lock": threading.Lock(),
+    }
+
+
+def _persist(store):
+    """Rewrite the file from the in-memory list and remember the resulting mtime."""
+    _write_history(store["items"])
+    store["mtime"] = _history_mtime()
+
+
+def _reload_if_changed(store):
+    """Re-read the file if it changed outside this process. Caller holds the store lock."""
+    mtime = _history_mtime()
+    if mtime != store["mtime"]:
+        store["items"][:] = _load_jsonl(store["path"])
+        store["index"].rebuild(store["items"])
+        store["mtime"] = mtime
+
+
+@contextmanager
+def history_writer():
+    """Group in-memory history edits into a single atomic rewrite.
+
+    Yields the store with its lock held; the file is rewritten once on a clean exit.
+    """
+    store = _history_store()
+    with store["lock"]:
+        # Edit the file's current contents, not a list that predates an outside change
+        _reload_if_changed(store)
+        yield store
+        _persist(store)
+
+
+def _synced_store():
+    """The history store, re-read first if the file changed outside this process."""
+    store = _history_store()
+    if _history_mtime() != store["mtime"]:
+        with store["lock"]:
+            _reload_if_changed(store)
+    return store
 
 
 def load_history():
-    """Load history from JSON file."""
-    history_file = "content_history.json"
-    if os.path.exists(history_file):
-        try:
-            with open(history_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+    """Return a snapshot of the history list.
+
+    The parsed list is reused across reruns and only re-read when the file's mtime
+    no longer matches the last write made by this process (e.g. edited by hand).
+    """
+    return list(_synced_store()["items"])
+
+
+def get_index():
+    """The live SearchIndex for the current history."""
+    return _synced_store()["index"]
 
 
 def save_to_history(record):
     """Save a record to history."""
-    history = load_history()
-    record["id"] = len(history) + 1
-    record["timestamp"] = datetime.datetime.now().isoformat()
+    store = _history_store()
+    record = dict(record)
+    # Random ids stay unique after deletes and need no look at existing history
+    record["id"] = uuid.uuid4().hex
+    record["timestamp"] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
     record["favorite"] = False
-    history.append(record)
-    
-    with open("content_history.json", "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+    with store["lock"]:
+        _reload_if_changed(store)
+        store["items"].append(record)
+        store["index"].add(record)
+        
+        with open(store["path"], "ab") as f:
+            f.write(_json_line(record))
+        store["mtime"] = _history_mtime()
 
 
 def toggle_favorite(item_id):
     """Toggle favorite status of an item."""
-    history = load_history()
-    for item in history:
-        if item["id"] == item_id:
-            item["favorite"] = not item.get("favorite", False)
-            break
-    
-    with open("content_history.json", "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+    with history_writer() as store:
+        for item in store["items"]:
+            if item["id"] == item_id:
+                item["favorite"] = not item.get("favorite", False)
+                store["index"].toggle_fav(item_id, item["favorite"])
+                break
 
 
 def delete_content(item_id):
     """Delete a content item from history."""
-    history = load_history()
-    updated_history = [item for item in history if item["id"] != item_id]
-    
-    with open("content_history.json", "w", encoding="utf-8") as f:
-        json.dump(updated_history, f, ensure_ascii=False, indent=2)
-    
-    return len(history) != len(updated_history)  # Return True if item was deleted
+    return delete_many([item_id]) > 0  # Return True if item was deleted
+
+
+def delete_many(item_ids):
+    """Delete several items with a single rewrite. Returns the number removed."""
+    item_ids = frozenset(item_ids)  # Set membership keeps the filter below O(N + M)
+    with history_writer() as store:
+        items = store["items"]
+        updated_history = [item for item in items if item["id"] not in item_ids]
+        removed = len(items) - len(updated_history)
+        items[:] = updated_history
+        for item_id in item_ids:
+            store["index"].remove(item_id)
+    return removed
+
+
+def clear_history():
+    """Delete every history item."""
+    with history_writer() as store:
+        store["items"].clear()
+        store["index"].rebuild()
 
 
 def search_history(query, filter_type=None, filter_favorite=False):
     """Search through history with filters."""
-    history = load_history()
+    q = query.lower() if query else ""
+    type_filter = filter_type if filter_type and filter_type != "All" else None
+    if not (q or type_filter or filter_favorite):
+        return load_history()
+    ids = _search_ids_cached(q, type_filter, bool(filter_favorite), _history_mtime())
+    # Map back through the live index; an id deleted since the lookup is simply skipped
+    items = get_index().items
+    return [items[item_id] for item_id in ids if item_id in items]
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _search_ids_cached(q, type_filter, filter_favorite, mtime):
+    """Ids of matching items, in history order, for a normalized (query, type, favorites)
+    triple at a given file mtime.
+
+    Only ids are cached: pickling whole records on every cache hit cost more than the
+    indexed search itself. Candidates come from the index first; only they are visited,
+    in history order, for the substring check.
+    """
+    index = get_index()
+    store = _history_store()
     results = []
+    with store["lock"]:
+        candidates = index.candidates(q, type_filter, filter_favorite)
+        if candidates is None:
+            # No selective term (e.g. "a" or "!!"): nothing to narrow by, check every item
+            ordered_ids = list(index.items)
+        elif 2 * len(candidates) > len(index.items):
+            # Most items match; a membership walk is cheaper than sorting them
+            ordered_ids = [item_id for item_id in index.items if item_id in candidates]
+        else:
+            ordered_ids = sorted(candidates, key=index.order.__getitem__)
+        
+        lowered = index.lowered
+        for item_id in ordered_ids:
+            # Confirm the full query (punctuation and spacing included) on the lowercased fields
+            if q:
+                keyword_lc, output_lc, tags_lc = lowered[item_id]
+                if not (q in keyword_lc or q in output_lc or q in tags_lc):
+                    continue
+            results.append(item_id)
+    
+    return tuple(results)
+
+
+@st.cache_data(show_spinner=False)
+def distinct_content_types(mtime):
+    """Sorted content types present in history, for the History page type filter."""
+    return sorted({h.get("content_type", "Unknown") for h in load_history()})
+
+
+@st.cache_data(show_spinner=False)
+def compute_analytics(mtime):
+    """Aggregate everything the Analytics page shows, as column counts over the history."""
+    import pandas as pd  # Only the Analytics page needs it; keeps app start-up light
     
-    for item in history:
-        # Filter by favorite
-        if filter_favorite and not item.get("favorite", False):
-            continue
-            
-        # Filter by type
-        if filter_type and filter_type != "All" and item.get("content_type") != filter_type:
-            continue
-            
-        # Search in content
-        if query.lower() in item.get("keyword", "").lower() or \
-           query.lower() in item.get("output", "").lower() or \
-           query.lower() in item.get("tags", "").lower():
-            results.append(item)
-    
-    return results
+    history = load_history()
+    df = pd.DataFrame.from_records(
+        history, columns=["content_type", "language", "keyword", "favorite"]
+    ).fillna({"content_type": "Unknown", "language": "Unknown", "keyword": "", "favorite": False})
+    
+    # sort=False keeps first-seen order, so charts and ties read the same as before
+    keywords = df["keyword"].str.lower()
+    keyword_counts = keywords[keywords != ""].value_counts(sort=False)
+    top_keywords = keyword_counts.sort_values(ascending=False, kind="stable").head(10)
+    
+    return {
+        "total": len(history),
+        "favorites": int(df["favorite"].astype(bool).sum()),
+        "type_counts": df["content_type"].value_counts(sort=False).to_dict(),
+        "lang_counts": df["language"].value_counts(sort=False).to_dict(),
+        # Partial selection instead of sorting all N items just to keep the first few
+        "recent": heapq.nlargest(5, history, key=lambda x: x.get("timestamp", "")),
+        "top_keywords": list(top_keywords.items()),
+    }
+
+
+def iter_export():
+    """Yield the history text export as UTF-8 chunks, one item at a time."""
+    yield ("AI Quote & Poem Generator - Content History\n" + "=" * 50 + "\n\n").encode("utf-8")
+    
+    for item in load_history():
+        yield (
+            f"ID: {item.get('id', 'N/A')}\n"
+            f"Keyword: {item.get('keyword', 'N/A')}\n"
+            f"Type: {item.get('content_type', 'N/A')}\n"
+            f"Language: {item.get('language', 'N/A')}\n"
+            f"Tone: {item.get('tone', 'N/A')}\n"
+            f"Date: {item.get('timestamp', 'N/A')}\n"
+            f"Favorite: {'Yes' if item.get('favorite') else 'No'}\n"
+            f"Tags: {item.get('tags', 'None')}\n"
+            f"Content:\n{item.get('output', 'N/A')}\n"
+            + "-" * 30 + "\n\n"
+        ).encode("utf-8")
 
 
 def export_history_as_text():
-    """Export history as formatted text."""
-    history = load_history()
-    content = "AI Quote & Poem Generator - Content History\n"
-    content += "=" * 50 + "\n\n"
-    
-    for item in history:
-        content += f"ID: {item.get('id', 'N/A')}\n"
-        content += f"Keyword: {item.get('keyword', 'N/A')}\n"
-        content += f"Type: {item.get('content_type', 'N/A')}\n"
-        content += f"Language: {item.get('language', 'N/A')}\n"
-        content += f"Tone: {item.get('tone', 'N/A')}\n"
-        content += f"Date: {item.get('timestamp', 'N/A')}\n"
-        content += f"Favorite: {'Yes' if item.get('favorite') else 'No'}\n"
-        content += f"Tags: {item.get('tags', 'None')}\n"
-        content += f"Content:\n{item.get('output', 'N/A')}\n"
-        content += "-" * 30 + "\n\n"
-    
-    return content
+    """Export history as formatted text, in a bytes buffer download_button can read."""
+    buf = BytesIO()
+    buf.writelines(iter_export())
+    buf.seek(0)
+    return buf
+
+
+THEMES = {
+    "Light": {
+        "bg_color": "#ffffff",
+        "text_color": "#000000",
+        "accent_color": "#007bff",
+        "secondary_color": "#f8f9fa",
+        "content_bg": "linear-gradient(135deg, #007bff 0%, #0056b3 100%)",
+        "content_text": "#ffffff",
+        "input_bg": "#ffffff",
+        "input_border": "#ced4da",
+        "button_text": "#ffffff"
+    },
+    "Dark": {
+        "bg_color": "#1a1a1a",
+        "text_color": "#ffffff", 
+        "accent_color": "#58a6ff",
+        "secondary_color": "#2d2d2d",
+        "content_bg": "linear-gradient(135deg, #1f6feb 0%, #4969f5 100%)",
+        "content_text": "#ffffff",
+        "input_bg": "#2d2d2d",
+        "input_border": "#58a6ff",
+        "button_text": "#000000"
+    },
+    "Ocean": {
+        "bg_color": "#f0f8ff",
+        "text_color": "#0d47a1",
+        "accent_color": "#1976d2",
+        "secondary_color": "#e3f2fd",
+        "content_bg": "linear-gradient(135deg, #1976d2 0%, #42a5f5 100%)",
+        "content_text": "#ffffff",
+        "input_bg": "#e3f2fd",
+        "input_border": "#1976d2",
+        "button_text": "#ffffff"
+    },
+    "Forest": {
+        "bg_color": "#f1f8e9",
+        "text_color": "#1b5e20",
+        "accent_color": "#388e3c",
+        "secondary_color": "#c8e6c9",
+        "content_bg": "linear-gradient(135deg, #388e3c 0%, #66bb6a 100%)",
+        "content_text": "#ffffff",
+        "input_bg": "#c8e6c9",
+        "input_border": "#388e3c",
+        "button_text": "#ffffff"
+    }
+}
+
+# Rules shared by every theme; per-theme values come from THEMES
+BASE_THEME_CSS = Template("""
+.stApp {
+    background-color: $bg_color !important;
+    color: $text_color;
+}
+
+/* Main text elements */
+$text_selectors {
+    color: $text_color !important;
+}
+
+/* Sidebar */
+section[data-testid="stSidebar"], section[data-testid="stSidebar"] > div {
+    background-color: $secondary_color !important;
+}
+
+section[data-testid="stSidebar"] * {
+    color: $text_color !important;
+}
+
+/* Input fields */
+.stTextInput input {
+    background-color: $input_bg !important;
+    color: $text_color !important;
+    border: 1px solid $input_border !important;
+}
+
+.stSelectbox > div > div {
+    background-color: $input_bg !important;
+    color: $text_color !important;
+}
+
+.stSelectbox > div > div > div {
+    color: $text_color !important;
+}
+
+/* Radio buttons */
+.stRadio > div, .stRadio label {
+    color: $text_color !important;
+}
+
+/* Buttons */
+.stButton > button {
+    background-color: $accent_color !important;
+    color: $button_text !important;
+    border: none !important;
+}
+
+.stButton > button:hover {
+    background-color: ${accent_color}dd !important;
+}
+
+/* Content box */
+.content-box {
+    background: $content_bg;
+    color: $content_text;
+    padding: 20px;
+    border-radius: 15px;
+    margin: 10px 0;
+    font-family: 'Georgia', serif;
+    font-style: italic;
+    text-align: center;
+    box-shadow: 0 8px 16px rgba(0, 0, 0, 0.1);
+    border: 2px solid $accent_color;
+}
+
+/* History items */
+.history-item {
+    background-color: $secondary_color !important;
+    padding: 15px;
+    border-radius: 10px;
+    margin: 10px 0;
+    border-left: 4px solid $accent_color;
+    color: $text_color !important;
+}
+
+.history-item h4, .history-item p, .history-item small {
+    color: $text_color !important;
+}
+
+/* Metrics */
+[data-testid="metric-container"], [data-testid="metric-container"] > div {
+    color: $text_color !important;
+}
+""")
+
+# Elements the main text colour is forced on. The themes used different sets before
+# they shared a template; Light keeps its rules scoped to the app container.
+THEME_TEXT_SELECTORS = {
+    "Light": ".stApp, .stApp p, .stApp span, .stApp div, .stApp h1, .stApp h2, .stApp h3, .stApp h4, .stApp h5, .stApp h6",
+    "Dark": ".stMarkdown, p, h1, h2, h3, span, div",
+}
+DEFAULT_TEXT_SELECTORS = ".stMarkdown, .stText, p, span, div, h1, h2, h3, h4, h5, h6"
+
+# Extra rules for the Light theme: it styles nested buttons and forces text colour on every descendant
+LIGHT_THEME_CSS = Template("""
+.stSelectbox select {
+    background-color: $input_bg !important;
+    color: $text_color !important;
+}
+
+.stButton button {
+    background-color: $accent_color !important;
+    color: $button_text !important;
+}
+
+.history-item *, [data-testid="metric-container"] * {
+    color: $text_color !important;
+}
+""")
+
+# Extra rules for the Dark theme: BaseWeb dropdowns render outside the app container
+DARK_THEME_CSS = Template("""
+.stSelectbox > div > div {
+    border: 1px solid $accent_color !important;
+}
+
+.stSelectbox div[data-baseweb="select"] > div, div[data-baseweb="popover"] {
+    background-color: #2b2b2b !important;
+}
+
+.stSelectbox div[data-baseweb="select"] span,
+div[data-baseweb="popover"] div[role="listitem"],
+div[data-baseweb="select"] [data-testid="stMarkdown"],
+.stSelectbox [role="option"] {
+    color: #ffffff !important;
+}
+
+div[data-baseweb="popover"] div[role="listitem"]:hover {
+    background-color: #3d3d3d !important;
+}
+
+.stRadio > div {
+    background-color: transparent !important;
+}
+
+.stRadio label {
+    font-weight: 500 !important;
+}
+
+button {
+    background-color: $accent_color !important;
+    color: $button_text !important;
+}
+""")
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCT_SPACE = re.compile(r"\s*([{};,>])\s*")
+
+
+def _minify_css(css):
+    """Strip comments and redundant whitespace from a CSS block."""
+    css = _CSS_COMMENT.sub("", css)
+    css = _CSS_SPACE.sub(" ", css)
+    css = _CSS_PUNCT_SPACE.sub(r"\1", css)
+    return css.replace(": ", ":").replace(";}", "}").strip()
+
+
+def _build_theme_css(theme_name):
+    """Render the minified <style> block for one theme."""
+    theme = THEMES.get(theme_name, THEMES["Light"])
+    css = BASE_THEME_CSS.substitute(theme, text_selectors=THEME_TEXT_SELECTORS.get(theme_name, DEFAULT_TEXT_SELECTORS))
+    if theme_name == "Light":
+        css += LIGHT_THEME_CSS.substitute(theme)
+    elif theme_name == "Dark":
+        css += DARK_THEME_CSS.substitute(theme)
+    return f"<style>{_minify_css(css)}</style>"
+
+
+@st.cache_resource(show_spinner=False)
+def _theme_css_table():
+    """Render every theme's CSS once per process instead of re-templating it on each rerun."""
+    return {name: _build_theme_css(name) for name in THEMES}
 
 
 def apply_theme(theme_name):
     """Apply custom CSS themes."""
-    themes = {
-        "Light": {
-            "bg_color": "#ffffff",
-            "text_color": "#000000",
-            "accent_color": "#007bff",
-            "secondary_color": "#f8f9fa",
-            "content_bg": "linear-gradient(135deg, #007bff 0%, #0056b3 100%)",
-            "content_text": "#ffffff"
-        },
-        "Dark": {
-            "bg_color": "#1a1a1a",
-            "text_color": "#ffffff", 
-            "accent_color": "#58a6ff",
-            "secondary_color": "#2d2d2d",
-            "content_bg": "linear-gradient(135deg, #1f6feb 0%, #4969f5 100%)",
-            "content_text": "#ffffff"
-        },
-        "Ocean": {
-            "bg_color": "#f0f8ff",
-            "text_color": "#0d47a1",
-            "accent_color": "#1976d2",
-            "secondary_color": "#e3f2fd",
-            "content_bg": "linear-gradient(135deg, #1976d2 0%, #42a5f5 100%)",
-            "content_text": "#ffffff"
-        },
-        "Forest": {
-            "bg_color": "#f1f8e9",
-            "text_color": "#1b5e20",
-            "accent_color": "#388e3c",
-            "secondary_color": "#c8e6c9",
-            "content_bg": "linear-gradient(135deg, #388e3c 0%, #66bb6a 100%)",
-            "content_text": "#ffffff"
-        }
-    }
-    
-    theme = themes.get(theme_name, themes["Light"])
-    
-    # Special handling for Dark theme
-    if theme_name == "Dark":
-        css = f"""
-        <style>
-        /* Force dark theme text visibility */
-        .stApp {{
-            background-color: {theme['bg_color']} !important;
-        }}
-        
-        .stMarkdown, p, h1, h2, h3, span, div {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        /* Improve select box visibility */
-        .stSelectbox > div > div {{
-            background-color: {theme['secondary_color']} !important;
-            border: 1px solid {theme['accent_color']} !important;
-        }}
-        
-        .stSelectbox > div > div > div {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        /* Style dropdown options */
-        .stSelectbox div[data-baseweb="select"] > div {{
-            background-color: #2b2b2b !important;
-        }}
-        
-        .stSelectbox div[data-baseweb="select"] span {{
-            color: #ffffff !important;
-        }}
-        
-        /* Dropdown menu popup */
-        div[data-baseweb="popover"] {{
-            background-color: #2b2b2b !important;
-        }}
-        
-        div[data-baseweb="popover"] div[role="listitem"] {{
-            color: #ffffff !important;
-        }}
-        
-        div[data-baseweb="popover"] div[role="listitem"]:hover {{
-            background-color: #3d3d3d !important;
-        }}
-        
-        /* Selected option */
-        div[data-baseweb="select"] [data-testid="stMarkdown"] {{
-            color: #ffffff !important;
-        }}
-        
-        /* Dropdown options text */
-        .stSelectbox [role="option"] {{
-            color: #ffffff !important;
-        }}
-        
-        /* Radio buttons */
-        .stRadio > div {{
-            background-color: transparent !important;
-        }}
-        
-        .stRadio label {{
-            color: {theme['text_color']} !important;
-            font-weight: 500 !important;
-        }}
-        
-        section[data-testid="stSidebar"] {{
-            background-color: {theme['secondary_color']} !important;
-        }}
-        
-        section[data-testid="stSidebar"] * {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        button {{
-            background-color: {theme['accent_color']} !important;
-            color: #000000 !important;
-        }}
-        </style>
-        """
-    # Force light theme to have proper visibility
-    elif theme_name == "Light":
-        css = f"""
-        <style>
-        /* Force light theme styling */
-        .stApp {{
-            background-color: #ffffff !important;
-        }}
-        
-        /* Sidebar styling for light theme */
-        section[data-testid="stSidebar"] {{
-            background-color: #f8f9fa !important;
-        }}
-        
-        section[data-testid="stSidebar"] > div {{
-            background-color: #f8f9fa !important;
-        }}
-        
-        /* All text elements */
-        .stApp, .stApp p, .stApp span, .stApp div, .stApp h1, .stApp h2, .stApp h3, .stApp h4, .stApp h5, .stApp h6 {{
-            color: #000000 !important;
-        }}
-        
-        /* Sidebar text */
-        section[data-testid="stSidebar"] * {{
-            color: #000000 !important;
-        }}
-        
-        /* Input fields */
-        .stTextInput input {{
-            background-color: #ffffff !important;
-            color: #000000 !important;
-            border: 1px solid #ced4da !important;
-        }}
-        
-        .stSelectbox select {{
-            background-color: #ffffff !important;
-            color: #000000 !important;
-        }}
-        
-        .stSelectbox > div > div {{
-            background-color: #ffffff !important;
-            color: #000000 !important;
-        }}
-        
-        /* Radio buttons */
-        .stRadio label {{
-            color: #000000 !important;
-        }}
-        
-        /* Buttons */
-        .stButton button {{
-            background-color: #007bff !important;
-            color: #ffffff !important;
-        }}
-        
-        /* Content box */
-        .content-box {{
-            background: linear-gradient(135deg, #007bff 0%, #0056b3 100%);
-            color: #ffffff;
-            padding: 20px;
-            border-radius: 15px;
-            margin: 10px 0;
-            font-family: 'Georgia', serif;
-            font-style: italic;
-            text-align: center;
-            box-shadow: 0 8px 16px rgba(0, 0, 0, 0.1);
-        }}
-        
-        /* History items */
-        .history-item {{
-            background-color: #f8f9fa !important;
-            color: #000000 !important;
-            padding: 15px;
-            border-radius: 10px;
-            margin: 10px 0;
-            border-left: 4px solid #007bff;
-        }}
-        
-        .history-item * {{
-            color: #000000 !important;
-        }}
-        
-        /* Metrics */
-        [data-testid="metric-container"] {{
-            color: #000000 !important;
-        }}
-        
-        [data-testid="metric-container"] * {{
-            color: #000000 !important;
-        }}
-        </style>
-        """
-    else:
-        # For other themes (Dark, Ocean, Forest) - keep original styling
-        css = f"""
-        <style>
-        .stApp {{
-            background-color: {theme['bg_color']};
-            color: {theme['text_color']};
-        }}
-        
-        /* Main text elements */
-        .stMarkdown, .stText, p, span, div {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        /* Headers */
-        h1, h2, h3, h4, h5, h6 {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        /* Sidebar */
-        .css-1d391kg {{
-            background-color: {theme['secondary_color']};
-        }}
-        
-        .css-1d391kg .stMarkdown, .css-1d391kg p {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        /* Input fields */
-        .stTextInput > div > div > input {{
-            background-color: {theme['secondary_color']} !important;
-            color: {theme['text_color']} !important;
-            border: 1px solid {theme['accent_color']} !important;
-        }}
-        
-        .stSelectbox > div > div {{
-            background-color: {theme['secondary_color']} !important;
-            color: {theme['text_color']} !important;
-        }}
-        
-        .stSelectbox > div > div > div {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        /* Buttons */
-        .stButton > button {{
-            background-color: {theme['accent_color']} !important;
-            color: #ffffff !important;
-            border: none !important;
-        }}
-        
-        .stButton > button:hover {{
-            background-color: {theme['accent_color']}dd !important;
-        }}
-        
-        /* Radio buttons */
-        .stRadio > div {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        .stRadio > div > label {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        /* Content box */
-        .content-box {{
-            background: {theme['content_bg']};
-            color: {theme['content_text']};
-            padding: 20px;
-            border-radius: 15px;
-            margin: 10px 0;
-            font-family: 'Georgia', serif;
-            font-style: italic;
-            text-align: center;
-            box-shadow: 0 8px 16px rgba(0, 0, 0, 0.1);
-            border: 2px solid {theme['accent_color']};
-        }}
-        
-        /* History items */
-        .history-item {{
-            background-color: {theme['secondary_color']} !important;
-            padding: 15px;
-            border-radius: 10px;
-            margin: 10px 0;
-            border-left: 4px solid {theme['accent_color']};
-            color: {theme['text_color']} !important;
-        }}
-        
-        .history-item h4 {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        .history-item p {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        .history-item small {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        /* Metrics */
-        [data-testid="metric-container"] {{
-            color: {theme['text_color']} !important;
-        }}
-        
-        [data-testid="metric-container"] > div {{
-            color: {theme['text_color']} !important;
-        }}
-        </style>
-        """
-    
-    st.markdown(css, unsafe_allow_html=True)
+    css_table = _theme_css_table()
+    st.markdown(css_table.get(theme_name, css_table["Light"]), unsafe_allow_html=True)
 
 
 def main():
@@ -623,8 +1099,8 @@ def main():
         st.markdown("### 🎨 Theme")
         new_theme = st.selectbox(
             "Choose Theme",
-            ["Light", "Dark", "Ocean", "Forest"],
-            index=["Light", "Dark", "Ocean", "Forest"].index(st.session_state.theme)
+            list(THEMES),
+            index=list(THEMES).index(st.session_state.theme)
         )
         if new_theme != st.session_state.theme:
             st.session_state.theme = new_theme
@@ -641,19 +1117,20 @@ def main():
             st.session_state.page = page
             st.rerun()
         
-        # Quick stats
+        # Quick stats (this snapshot is shared with the page below instead of reloading it)
         history = load_history()
+        fav_count = sum(1 for h in history if h.get("favorite", False))
         st.markdown("### 📊 Quick Stats")
         st.metric("Total Generated", len(history))
-        st.metric("Favorites", len([h for h in history if h.get("favorite", False)]))
+        st.metric("Favorites", fav_count)
     
     # Main content based on page
     if st.session_state.page == "Generator":
         show_generator_page()
     elif st.session_state.page == "History":
-        show_history_page()
+        show_history_page(history)
     elif st.session_state.page == "Analytics":
-        show_analytics_page()
+        show_analytics_page(history)
 
 
 def show_generator_page():
@@ -710,6 +1187,13 @@ def show_generator_page():
             )
         else:
             rhyme_scheme = "Free Verse"
+        
+        # Deterministic output can be served from cache for identical settings
+        deterministic = st.checkbox(
+            "🎯 Deterministic",
+            help="Use temperature 0 so identical settings always give the same (cached) result"
+        )
+        temperature = 0.0 if deterministic else 0.7
     
     # Length adjustment
     if content_type not in ["Haiku", "Social Media Caption"]:
@@ -740,10 +1224,19 @@ def show_generator_page():
                 
                 with st.spinner("✨ Creating your masterpiece..."):
                     try:
-                        output = generate_text(prompt, temperature=0.7, max_tokens=300)
+                        if temperature == 0.0:
+                            output = _cached_generate(prompt, MODEL_PROVIDER, ACTIVE_MODEL, 300, temperature)
+                        else:
+                            # Show tokens as they arrive; the placeholder is cleared once the full text is in
+                            stream_placeholder = st.empty()
+                            output = stream_placeholder.write_stream(stream_text(prompt, temperature=temperature, max_tokens=300))
+                            stream_placeholder.empty()
+                            # Same fallback as the non-streaming path, e.g. for a safety block with no text
+                            output = (output.strip() if isinstance(output, str) else "") or "No response generated"
                         
                         if output:
                             # Store in session state
+                            st.session_state.variants = []
                             st.session_state.current_content = {
                                 "keyword": keyword.strip(),
                                 "content_type": content_type,
@@ -753,6 +1246,7 @@ def show_generator_page():
                                 "rhyme_scheme": rhyme_scheme,
                                 "length_words": length_words,
                                 "tags": tags.strip(),
+                                "temperature": temperature,
                                 "output": output
                             }
                             
@@ -770,7 +1264,7 @@ def show_generator_page():
         # Display content in styled box
         st.markdown(f"""
         <div class="content-box">
-            {content['output']}
+            {html.escape(content['output'])}
         </div>
         """, unsafe_allow_html=True)
         
@@ -804,6 +1298,13 @@ def show_generator_page():
                 st.balloons()
         
         with col_act3:
+            variant_count = st.number_input(
+                "Variants",
+                min_value=1,
+                max_value=5,
+                value=1,
+                help="Number of alternatives to generate in parallel"
+            )
             if st.button("🔄 Regenerate", use_container_width=True):
                 # Regenerate with the same parameters
                 prompt = build_prompt(
@@ -818,7 +1319,17 @@ def show_generator_page():
                 
                 with st.spinner("✨ Regenerating your masterpiece..."):
                     try:
-                        output = generate_text(prompt, temperature=0.7, max_tokens=300)
+                        if variant_count > 1:
+                            # Fire all variant requests at once instead of one after another
+                            outputs = asyncio.run(generate_batch([prompt] * variant_count, temperature=0.7, max_tokens=300))
+                            st.session_state.variants = [o for o in outputs if o]
+                            st.rerun()
+                        
+                        temperature = content.get('temperature', 0.7)
+                        if temperature == 0.0:
+                            output = _cached_generate(prompt, MODEL_PROVIDER, ACTIVE_MODEL, 300, temperature)
+                        else:
+                            output = generate_text(prompt, temperature=temperature, max_tokens=300)
                         
                         if output:
                             # Update the output in the current content
@@ -831,10 +1342,13 @@ def show_generator_page():
         
         with col_act4:
             # Copy button
+            # A JSON string literal can't be broken out of like a backtick template; "<" is
+            # escaped too so the output can't close the <script> tag
+            output_js = json.dumps(content['output']).replace("<", "\\u003c")
             copy_js = f"""
             <script>
             function copyContent() {{
-                navigator.clipboard.writeText(`{content['output']}`).then(function() {{
+                navigator.clipboard.writeText({output_js}).then(function() {{
                     alert('📋 Copied to clipboard!');
                 }});
             }}
@@ -853,13 +1367,26 @@ def show_generator_page():
             </button>
             """
             st.components.v1.html(copy_js, height=40)
+        
+        # Parallel variants from the last regeneration
+        if st.session_state.get('variants'):
+            st.markdown("#### 🔀 Variants")
+            for i, variant in enumerate(st.session_state.variants):
+                st.markdown(f"""
+                <div class="content-box">
+                    {html.escape(variant)}
+                </div>
+                """, unsafe_allow_html=True)
+                if st.button(f"✅ Use Variant {i + 1}", key=f"use_variant_{i}"):
+                    st.session_state.current_content['output'] = variant
+                    st.session_state.variants = []
+                    st.rerun()
 
 
-def show_history_page():
+def show_history_page(history):
     """History management page."""
     st.title("📚 Content History")
-    
-    history = load_history()
+    today_str = datetime.date.today().strftime('%Y%m%d')
     
     if not history:
         st.info("No content generated yet. Go to the Generator page to create some!")
@@ -871,8 +1398,7 @@ def show_history_page():
         if st.button("🗑️ Clear All History", help="Delete all content history"):
             if st.session_state.get('confirm_clear_all', False):
                 # Clear all history
-                with open("content_history.json", "w", encoding="utf-8") as f:
-                    json.dump([], f, ensure_ascii=False, indent=2)
+                clear_history()
                 st.success("✅ All history cleared!")
                 st.session_state.confirm_clear_all = False
                 st.rerun()
@@ -893,21 +1419,54 @@ def show_history_page():
         search_query = st.text_input("🔍 Search content", placeholder="Search keywords, content, tags...")
     
     with col_search2:
-        filter_type = st.selectbox("Filter by Type", ["All"] + list(set([h.get("content_type", "Unknown") for h in history])))
+        filter_type = st.selectbox("Filter by Type", ["All"] + distinct_content_types(_history_mtime()))
     
     with col_search3:
         filter_favorite = st.checkbox("⭐ Favorites Only")
     
     with col_search4:
         if st.button("📤 Export All"):
+            # Built only when asked for, not on every rerun of the page
             export_data = export_history_as_text()
             st.download_button(
                 "Download History",
                 data=export_data,
-                file_name=f"content_history_{datetime.datetime.now().strftime('%Y%m%d')}.txt",
+                file_name=f"content_history_{today_str}.txt",
                 mime="text/plain"
             )
     
+    render_history_list(search_query, filter_type, filter_favorite)
+
+
+# Row markup shared by every history item; fields are HTML-escaped before formatting since they come from users and the model
+HISTORY_TPL = """
+                <div class="history-item">
+                    <h4>{star}{ctype} - {kw}</h4>
+                    <p><strong>Content:</strong> {out}{more}</p>
+                    <small>
+                        <strong>Language:</strong> {lang} | 
+                        <strong>Tone:</strong> {tone} | 
+                        <strong>Tags:</strong> {tags} | 
+                        <strong>Date:</strong> {date}
+                    </small>
+                </div>
+                """
+
+
+def _set_state(key, value):
+    """Button callback that sets a session_state flag."""
+    st.session_state[key] = value
+
+
+@st.fragment
+def render_history_list(search_query, filter_type, filter_favorite):
+    """Results list of the History page.
+
+    Runs as a fragment so per-item actions and paging rerun only this list, not the
+    whole app. Results are recomputed from the store on every fragment run.
+    """
+    history = load_history()
+    
     # Search and filter results
     if search_query or filter_type != "All" or filter_favorite:
         filtered_history = search_history(search_query, filter_type, filter_favorite)
@@ -924,12 +1483,8 @@ def show_history_page():
             if st.button("🗑️ Delete All Filtered", help="Delete all currently filtered items"):
                 if st.session_state.get('confirm_bulk_delete', False):
                     # Delete all filtered items
-                    history = load_history()
-                    filtered_ids = [item['id'] for item in filtered_history]
-                    updated_history = [item for item in history if item['id'] not in filtered_ids]
-                    
-                    with open("content_history.json", "w", encoding="utf-8") as f:
-                        json.dump(updated_history, f, ensure_ascii=False, indent=2)
+                    filtered_ids = frozenset(item['id'] for item in filtered_history)
+                    delete_many(filtered_ids)
                     
                     st.success(f"✅ Deleted {len(filtered_ids)} items!")
                     st.session_state.confirm_bulk_delete = False
@@ -940,141 +1495,132 @@ def show_history_page():
         
         with col_bulk2:
             if st.session_state.get('confirm_bulk_delete', False):
-                if st.button("❌ Cancel"):
-                    st.session_state.confirm_bulk_delete = False
-                    st.rerun()
+                st.button("❌ Cancel", on_click=_set_state, args=("confirm_bulk_delete", False))
     
-    for item in reversed(filtered_history):  # Show newest first
+    # Only build widgets for one page of results; every rerun re-creates them
+    page_count = max(1, math.ceil(len(filtered_history) / HISTORY_PAGE_SIZE))
+    if page_count > 1:
+        page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+        st.caption(f"Page {page_number} of {page_count}")
+    else:
+        page_number = 1
+    newest_first = filtered_history[::-1]
+    page_items = newest_first[(page_number - 1) * HISTORY_PAGE_SIZE:page_number * HISTORY_PAGE_SIZE]
+    
+    # Bound once per fragment run rather than resolved on every row
+    md, btn, cols, dlbtn, ssget = st.markdown, st.button, st.columns, st.download_button, st.session_state.get
+    esc = html.escape
+    for item in page_items:
         with st.container():
-            col_hist1, col_hist2 = st.columns([4, 1])
+            g = item.get
+            item_id = item['id']
+            output = g('output', 'No content')
+            md(HISTORY_TPL.format(
+                star='⭐ ' if g('favorite') else '',
+                ctype=esc(str(g('content_type', 'Unknown'))),
+                kw=esc(str(g('keyword', 'No keyword'))),
+                out=esc(output[:200]),
+                more='...' if len(output) > 200 else '',
+                lang=esc(str(g('language', 'N/A'))),
+                tone=esc(str(g('tone', 'N/A'))),
+                tags=esc(str(g('tags', 'None'))),
+                date=esc(g('timestamp', 'N/A')[:10]),
+            ), unsafe_allow_html=True)
             
-            with col_hist1:
-                st.markdown(f"""
-                <div class="history-item">
-                    <h4>{'⭐ ' if item.get('favorite') else ''}{item.get('content_type', 'Unknown')} - {item.get('keyword', 'No keyword')}</h4>
-                    <p><strong>Content:</strong> {item.get('output', 'No content')[:200]}{'...' if len(item.get('output', '')) > 200 else ''}</p>
-                    <small>
-                        <strong>Language:</strong> {item.get('language', 'N/A')} | 
-                        <strong>Tone:</strong> {item.get('tone', 'N/A')} | 
-                        <strong>Tags:</strong> {item.get('tags', 'None')} | 
-                        <strong>Date:</strong> {item.get('timestamp', 'N/A')[:10]}
-                    </small>
-                </div>
-                """, unsafe_allow_html=True)
+            # One row of action buttons under the item instead of a nested 2x2 grid
+            col_btn1, col_btn2, col_btn3, col_btn4 = cols(4)
             
-            with col_hist2:
-                # Action buttons in a grid
-                col_btn1, col_btn2 = st.columns(2)
-                
-                with col_btn1:
-                    if st.button(f"{'💔' if item.get('favorite') else '❤️'}", key=f"fav_{item['id']}", help="Toggle favorite"):
-                        toggle_favorite(item['id'])
-                        st.rerun()
-                
-                with col_btn2:
-                    if st.button("�️", key=f"delete_{item['id']}", help="Delete this item"):
-                        if st.session_state.get(f'confirm_delete_{item["id"]}', False):
-                            if delete_content(item['id']):
-                                st.success("✅ Item deleted!")
-                                st.session_state[f'confirm_delete_{item["id"]}'] = False
-                                st.rerun()
-                        else:
-                            st.session_state[f'confirm_delete_{item["id"]}'] = True
-                            st.warning("⚠️ Click delete again to confirm!")
-                
-                # Second row of buttons
-                col_btn3, col_btn4 = st.columns(2)
-                
-                with col_btn3:
-                    if st.button("�", key=f"copy_{item['id']}", help="View full content"):
-                        st.code(item.get('output', ''), language='text')
-                
-                with col_btn4:
-                    st.download_button(
-                        "📥",
-                        data=item.get('output', ''),
-                        file_name=f"{item.get('keyword', 'content')}_{item.get('content_type', 'unknown')}.txt",
-                        key=f"dl_{item['id']}",
-                        help="Download this item"
-                    )
+            with col_btn1:
+                if btn(f"{'💔' if g('favorite') else '❤️'}", key=f"fav_{item_id}", help="Toggle favorite"):
+                    toggle_favorite(item_id)
+                    # Full rerun so the sidebar favorites count updates too
+                    st.rerun()
+            
+            with col_btn2:
+                if btn("�️", key=f"delete_{item_id}", help="Delete this item"):
+                    # A single pending id instead of one confirm flag per item ever shown
+                    if ssget('pending_delete_id') == item_id:
+                        if delete_content(item_id):
+                            st.success("✅ Item deleted!")
+                            st.session_state.pending_delete_id = None
+                            st.rerun()
+                    else:
+                        st.session_state.pending_delete_id = item_id
+                        st.warning("⚠️ Click delete again to confirm!")
                 
                 # Show cancel button if delete confirmation is pending
-                if st.session_state.get(f'confirm_delete_{item["id"]}', False):
-                    if st.button("❌ Cancel", key=f"cancel_{item['id']}"):
-                        st.session_state[f'confirm_delete_{item["id"]}'] = False
-                        st.rerun()
+                if ssget('pending_delete_id') == item_id:
+                    btn(
+                        "❌ Cancel",
+                        key=f"cancel_{item_id}",
+                        on_click=_set_state,
+                        args=('pending_delete_id', None)
+                    )
+            
+            with col_btn3:
+                show_full = btn("�", key=f"copy_{item_id}", help="View full content")
+            
+            with col_btn4:
+                dlbtn(
+                    "📥",
+                    data=g('output', ''),
+                    file_name=f"{g('keyword', 'content')}_{g('content_type', 'unknown')}.txt",
+                    key=f"dl_{item_id}",
+                    help="Download this item"
+                )
+            
+            # Full width below the buttons rather than squeezed into a button column
+            if show_full:
+                st.code(g('output', ''), language='text')
 
 
-def show_analytics_page():
+def show_analytics_page(history):
     """Analytics and insights page."""
     st.title("📊 Analytics & Insights")
     
-    history = load_history()
-    
     if not history:
         st.info("No data available yet. Generate some content first!")
         return
     
+    stats = compute_analytics(_history_mtime())
+    
     # Basic statistics
     col_stats1, col_stats2, col_stats3, col_stats4 = st.columns(4)
     
     with col_stats1:
-        st.metric("Total Content", len(history))
+        st.metric("Total Content", stats["total"])
     
     with col_stats2:
-        favorites = len([h for h in history if h.get("favorite", False)])
-        st.metric("Favorites", favorites)
+        st.metric("Favorites", stats["favorites"])
     
     with col_stats3:
-        languages = set([h.get("language", "Unknown") for h in history])
-        st.metric("Languages Used", len(languages))
+        st.metric("Languages Used", len(stats["lang_counts"]))
     
     with col_stats4:
-        types = set([h.get("content_type", "Unknown") for h in history])
-        st.metric("Content Types", len(types))
+        st.metric("Content Types", len(stats["type_counts"]))
     
     # Charts and analysis
     col_chart1, col_chart2 = st.columns(2)
     
     with col_chart1:
         st.subheader("Content Types Distribution")
-        type_counts = {}
-        for item in history:
-            content_type = item.get("content_type", "Unknown")
-            type_counts[content_type] = type_counts.get(content_type, 0) + 1
-        
-        if type_counts:
-            st.bar_chart(type_counts)
+        if stats["type_counts"]:
+            st.bar_chart(stats["type_counts"])
     
     with col_chart2:
         st.subheader("Language Usage")
-        lang_counts = {}
-        for item in history:
-            language = item.get("language", "Unknown")
-            lang_counts[language] = lang_counts.get(language, 0) + 1
-        
-        if lang_counts:
-            st.bar_chart(lang_counts)
+        if stats["lang_counts"]:
+            st.bar_chart(stats["lang_counts"])
     
     # Recent activity
     st.subheader("Recent Activity")
-    recent_items = sorted(history, key=lambda x: x.get("timestamp", ""), reverse=True)[:5]
-    
-    for item in recent_items:
+    for item in stats["recent"]:
         st.write(f"**{item.get('content_type', 'Unknown')}** about *{item.get('keyword', 'Unknown')}* - {item.get('timestamp', 'Unknown')[:10]}")
     
     # Popular keywords
     st.subheader("Popular Keywords")
-    keywords = {}
-    for item in history:
-        keyword = item.get("keyword", "").lower()
-        if keyword:
-            keywords[keyword] = keywords.get(keyword, 0) + 1
-    
-    if keywords:
-        sorted_keywords = sorted(keywords.items(), key=lambda x: x[1], reverse=True)[:10]
-        for keyword, count in sorted_keywords:
-            st.write(f"**{keyword.title()}**: {count} times")
+    for keyword, count in stats["top_keywords"]:
+        st.write(f"**{keyword.title()}**: {count} times")
     
     # Footer
     st.markdown("---")